@@ -1,29 +1,35 @@
 """Calculation Agent - Step 3a: Analyze calculations."""
 import os
-import json
+import re
+from functools import lru_cache
 from typing import List, Dict, Any
 from datetime import datetime
 from models.state import AssessmentState
 from services.bigquery_service import bigquery_service
 from utils.logger import logger
+from utils.json_utils import write_json_file
 
 
+# Keyword detectors, compiled once; case-insensitive matching replaces formula.lower()
+_COMPLEX_KEYWORDS_RE = re.compile(r'window_|lod|table_calc|rank|running_|lookup|match', re.IGNORECASE)
+_MEDIUM_KEYWORDS_RE = re.compile(r'if|case|sum|avg|count|max|min', re.IGNORECASE)
+_STRING_OPS_RE = re.compile(r'concat|split|replace|substring', re.IGNORECASE)
+
+
+@lru_cache(maxsize=8192)
 def _assess_complexity(formula: str) -> str:
-    """Assess calculation complexity based on formula."""
+    """Assess calculation complexity based on formula (cached, copy-pasted formulas are common)."""
     if not formula:
         return 'low'
     
-    formula_lower = formula.lower()
     complexity_score = 0
     
     # Complex functions
-    complex_keywords = ['window_', 'lod', 'table_calc', 'rank', 'running_', 'lookup', 'match']
-    if any(keyword in formula_lower for keyword in complex_keywords):
+    if _COMPLEX_KEYWORDS_RE.search(formula):
         complexity_score += 2
     
     # Medium complexity functions
-    medium_keywords = ['if', 'case', 'sum', 'avg', 'count', 'max', 'min']
-    if any(keyword in formula_lower for keyword in medium_keywords):
+    if _MEDIUM_KEYWORDS_RE.search(formula):
         complexity_score += 1
     
     # Nested functions (indicated by multiple parentheses)
@@ -31,7 +37,7 @@ def _assess_complexity(formula: str) -> str:
         complexity_score += 1
     
     # String operations
-    if any(op in formula_lower for op in ['concat', 'split', 'replace', 'substring']):
+    if _STRING_OPS_RE.search(formula):
         complexity_score += 1
     
     if complexity_score >= 3:
@@ -56,15 +62,16 @@ async def calculation_agent(state: AssessmentState) -> AssessmentState:
     parsed_calculations = state.get('parsed_calculations', [])
     if not parsed_calculations:
         logger.warning("No parsed calculations found, skipping calculation analysis")
-        state['calculation_analysis'] = []
-        state['status'] = 'analysis_complete'
-        return state
+        return {
+            'calculation_analysis': []
+        }
     
     job_id = state.get('job_id', 'unknown')
     created_at = datetime.utcnow().isoformat() + 'Z'
     
     # Process each parsed calculation
     analysis: List[Dict[str, Any]] = []
+    complexity_breakdown = {'low': 0, 'medium': 0, 'high': 0}
     
     for calculation in parsed_calculations:
         datasource_id = calculation.get('datasource_id', 'unknown')
@@ -89,13 +96,10 @@ async def calculation_agent(state: AssessmentState) -> AssessmentState:
         }
         
         analysis.append(record)
+        if complexity in complexity_breakdown:
+            complexity_breakdown[complexity] += 1
     
     logger.info(f"Analyzed {len(analysis)} calculations")
-    complexity_breakdown = {
-        'low': sum(1 for a in analysis if a.get('complexity') == 'low'),
-        'medium': sum(1 for a in analysis if a.get('complexity') == 'medium'),
-        'high': sum(1 for a in analysis if a.get('complexity') == 'high')
-    }
     logger.info(f"Complexity breakdown: {complexity_breakdown}")
     
     # Write to BigQuery (temporarily disabled)
@@ -107,8 +111,7 @@ async def calculation_agent(state: AssessmentState) -> AssessmentState:
     if output_dir and analysis:
         os.makedirs(output_dir, exist_ok=True)
         output_file = os.path.join(output_dir, "calculation_analysis.json")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(analysis, f, indent=2)
+        write_json_file(analysis, output_file)
         logger.info(f"Written {len(analysis)} calculation analysis records to {output_file}")
     
     # Update state (only return fields we're modifying to avoid parallel update conflicts)
@@ -1,11 +1,11 @@
 """Dashboard Agent - Step 3c: Analyze dashboards."""
 import os
-import json
 from typing import List, Dict, Any
 from datetime import datetime
 from models.state import AssessmentState
 from services.bigquery_service import bigquery_service
 from utils.logger import logger
+from utils.json_utils import write_json_file
 
 
 def _assess_complexity(features: Dict[str, Any], dependencies: Dict[str, Any]) -> str:
@@ -57,9 +57,9 @@ async def dashboard_agent(state: AssessmentState) -> AssessmentState:
     parsed_dashboards = state.get('parsed_dashboards', [])
     if not parsed_dashboards:
         logger.warning("No parsed dashboards found, skipping dashboard analysis")
-        state['dashboard_analysis'] = []
-        state['status'] = 'analysis_complete'
-        return state
+        return {
+            'dashboard_analysis': []
+        }
     
     job_id = state.get('job_id', 'unknown')
     created_at = datetime.utcnow().isoformat() + 'Z'
@@ -102,8 +102,7 @@ async def dashboard_agent(state: AssessmentState) -> AssessmentState:
     if output_dir and analysis:
         os.makedirs(output_dir, exist_ok=True)
         output_file = os.path.join(output_dir, "dashboard_analysis.json")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(analysis, f, indent=2)
+        write_json_file(analysis, output_file)
         logger.info(f"Written {len(analysis)} dashboard analysis records to {output_file}")
     
     # Update state (only return fields we're modifying to avoid parallel update conflicts)
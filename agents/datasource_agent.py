@@ -1,11 +1,11 @@
 """Data Source Agent - Step 3d: Analyze data sources."""
 import os
-import json
 from typing import List, Dict, Any
 from datetime import datetime
 from models.state import AssessmentState
 from services.bigquery_service import bigquery_service
 from utils.logger import logger
+from utils.json_utils import write_json_file
 
 
 def _assess_complexity(datasource_type: str, connection: Dict[str, Any]) -> str:
@@ -50,15 +50,16 @@ async def datasource_agent(state: AssessmentState) -> AssessmentState:
     parsed_datasources = state.get('parsed_datasources', [])
     if not parsed_datasources:
         logger.warning("No parsed datasources found, skipping datasource analysis")
-        state['datasource_analysis'] = []
-        state['status'] = 'analysis_complete'
-        return state
+        return {
+            'datasource_analysis': []
+        }
     
     job_id = state.get('job_id', 'unknown')
     created_at = datetime.utcnow().isoformat() + 'Z'
     
     # Process each parsed datasource
     analysis: List[Dict[str, Any]] = []
+    datasource_types = set()
     
     for datasource in parsed_datasources:
         datasource_id = datasource.get('id', '')
@@ -84,9 +85,10 @@ async def datasource_agent(state: AssessmentState) -> AssessmentState:
         }
         
         analysis.append(record)
+        datasource_types.add(datasource_type)
     
     logger.info(f"Analyzed {len(analysis)} datasources")
-    logger.info(f"Types: {', '.join(set(a.get('type', 'unknown') for a in analysis))}")
+    logger.info(f"Types: {', '.join(datasource_types)}")
     
     # Write to BigQuery (temporarily disabled)
     if analysis:
@@ -97,8 +99,7 @@ async def datasource_agent(state: AssessmentState) -> AssessmentState:
     if output_dir and analysis:
         os.makedirs(output_dir, exist_ok=True)
         output_file = os.path.join(output_dir, "datasource_analysis.json")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(analysis, f, indent=2)
+        write_json_file(analysis, output_file)
         logger.info(f"Written {len(analysis)} datasource analysis records to {output_file}")
     
     # Update state (only return fields we're modifying to avoid parallel update conflicts)
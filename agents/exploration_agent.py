@@ -1,11 +1,10 @@
 """Exploration Agent - Step 1: Discover components from parsed element files."""
 import os
-import json
 from typing import Dict, Any
 from models.state import AssessmentState
-from services.llm_service import llm_service
 from config.settings import get_settings
 from utils.logger import logger
+from utils.json_utils import write_json_file
 
 
 async def exploration_agent(state: AssessmentState) -> AssessmentState:
@@ -100,7 +99,9 @@ async def exploration_agent(state: AssessmentState) -> AssessmentState:
             state['status'] = 'exploration_complete'
             return state
         
-        # Call LLM to extract component catalog
+        # Call LLM to extract component catalog. Imported here so that building the
+        # workflow does not initialize Vertex AI until exploration actually runs.
+        from services.llm_service import llm_service
         logger.info(f"Extracting component catalog from {len(element_contents)} elements")
         discovered_components = await llm_service.extract_component_catalog(
             element_contents=element_contents,
@@ -127,8 +128,7 @@ async def exploration_agent(state: AssessmentState) -> AssessmentState:
         if output_dir and discovered_components:
             os.makedirs(output_dir, exist_ok=True)
             components_file = os.path.join(output_dir, "discovered_components.json")
-            with open(components_file, 'w', encoding='utf-8') as f:
-                json.dump(discovered_components, f, indent=2)
+            write_json_file(discovered_components, components_file)
             logger.info(f"Written discovered components to {components_file}")
         
         # Update state
@@ -2,7 +2,7 @@
 import os
 from typing import Dict, Any, List
 from models.state import AssessmentState
-from utils.xml_utils import get_first_level_elements, read_xml_element
+from utils.xml_utils import read_first_level_elements
 from utils.logger import logger
 
 
@@ -14,9 +14,9 @@ async def file_analysis_agent(state: AssessmentState) -> AssessmentState:
     OUTPUT: state with parsed_elements_paths and output_dir populated
     
     Process:
-    1. Get first-level elements using get_first_level_elements() tool
+    1. Read all first-level elements in one pass using read_first_level_elements() tool
+       (gets all instances of each element type)
     2. For each element:
-       - Read ALL content using read_xml_element() (gets all instances of that element type)
        - Save to output/{job_id}/{element_name}.xml (one file per element type)
        - Store file path and metadata in state
     3. Output: parsed_elements_paths list with all saved files
@@ -52,36 +52,32 @@ async def file_analysis_agent(state: AssessmentState) -> AssessmentState:
         os.makedirs(output_dir, exist_ok=True)
         logger.info(f"Created output directory: {output_dir}")
         
-        # Get first-level elements
-        element_names = get_first_level_elements(file_path)
-        if not element_names:
+        # Read all first-level elements in a single pass over the document
+        element_contents = read_first_level_elements(file_path)
+        if not element_contents:
             logger.warning("No first-level elements found")
             state['parsed_elements_paths'] = []
             state['output_dir'] = output_dir
             state['status'] = 'file_analysis_complete'
             return state
         
-        logger.info(f"Found {len(element_names)} first-level elements: {element_names}")
-        
         # Process each element
         parsed_elements_paths: List[Dict[str, Any]] = []
         
-        for element_name in element_names:
+        for element_name, element_content in element_contents.items():
             logger.info(f"Processing element: {element_name}")
             
-            # Read element content (all instances of this element type)
-            element_content = read_xml_element(file_path, element_name)
-            
             if not element_content:
                 logger.warning(f"No content found for element '{element_name}', skipping")
                 continue
             
-            # Save to file
+            # Save to file (encode once and write bytes; the encoded length is the file size)
             element_file_path = os.path.join(output_dir, f"{element_name}.xml")
-            with open(element_file_path, 'w', encoding='utf-8') as f:
-                f.write(element_content)
+            element_bytes = element_content.encode('utf-8')
+            with open(element_file_path, 'wb') as f:
+                f.write(element_bytes)
             
-            file_size = os.path.getsize(element_file_path)
+            file_size = len(element_bytes)
             logger.info(f"Saved {element_name} to {element_file_path} ({file_size:,} bytes)")
             
             # Store metadata
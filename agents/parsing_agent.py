@@ -1,20 +1,126 @@
 """Parsing Agent - Step 2: Extract detailed properties from components."""
 import os
-import json
 import re
-from typing import Dict, Any, List, Optional
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 from models.state import AssessmentState
 from utils.logger import logger
-from utils.xml_utils import read_xml_element
+from utils.json_utils import write_json_file
+from utils.xml_utils import find_elements, parse_xml_file
 
 
-def _sanitize_filename(name: str) -> str:
-    """Sanitize dashboard name for use in filename."""
-    # Remove invalid characters and replace spaces with underscores
-    sanitized = re.sub(r'[<>:"/\\|?*]', '', name)
-    sanitized = re.sub(r'\s+', '_', sanitized)
-    sanitized = sanitized.lower()
-    return sanitized[:100]  # Limit length
+# (formulas by column name, formulas by column caption, (column name, formula) in document order)
+FormulaIndex = Tuple[Dict[str, str], Dict[str, str], List[Tuple[str, str]]]
+
+
+def _build_formula_index(root: ET.Element) -> FormulaIndex:
+    """Index calculated <column> formulas by name and caption in one pass over the XML."""
+    by_name: Dict[str, str] = {}
+    by_caption: Dict[str, str] = {}
+    entries: List[Tuple[str, str]] = []
+    
+    for column in root.findall('.//column'):
+        calc_elem = column.find('.//calculation')
+        if calc_elem is None:
+            continue
+        formula = calc_elem.get('formula', '')
+        if not formula:
+            continue
+        
+        column_name = column.get('name', '')
+        column_caption = column.get('caption', '')
+        by_name.setdefault(column_name, formula)
+        by_caption.setdefault(column_caption, formula)
+        entries.append((column_name, formula))
+    
+    return by_name, by_caption, entries
+
+
+def _lookup_formula(index: FormulaIndex, calc_id: Optional[str], calc_name: Optional[str]) -> str:
+    """
+    Find the formula for a calculation in a formula index.
+    
+    Priority: 1) exact match by ID (column name), with or without the surrounding
+    brackets, e.g. "Calculation_123" against "[Calculation_123]", 2) match by name
+    (column caption), 3) partial match by ID.
+    """
+    by_name, by_caption, entries = index
+    calc_id_clean = calc_id.strip('[]') if calc_id else ''
+    
+    if calc_id:
+        if calc_id in by_name:
+            return by_name[calc_id]
+        # Checked before the partial scan so "Calculation_1" never resolves to "[Calculation_12]"
+        bracketed_id = f"[{calc_id_clean}]"
+        if bracketed_id in by_name:
+            return by_name[bracketed_id]
+    
+    if calc_name and calc_name in by_caption:
+        return by_caption[calc_name]
+    
+    if calc_id:
+        for column_name, formula in entries:
+            if calc_id_clean in column_name.strip('[]') or calc_id in column_name:
+                return formula
+    
+    return ''
+
+
+# Single case-insensitive scan for complexity keywords. The lookahead keeps matches
+# zero-width so a medium keyword never consumes the start of a high one.
+_FORMULA_COMPLEXITY_RE = re.compile(
+    r'(?=(?P<high>window_|lod|table_calc|rank|running_|lookup)|(?P<medium>if|case|sum|avg|count))',
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=4096)
+def _classify_formula_complexity(formula: str) -> str:
+    """Classify a formula as high/medium/low, stopping at the first high keyword (cached per formula)."""
+    complexity = 'low'
+    for match in _FORMULA_COMPLEXITY_RE.finditer(formula):
+        if match.group('high'):
+            return 'high'
+        complexity = 'medium'
+    return complexity
+
+
+def _extract_connection_details(root: ET.Element) -> Tuple[str, Dict[str, str]]:
+    """
+    Extract datasource type and connection details from the parsed datasources XML.
+    
+    Only the first <connection> element is inspected, so the result is the same
+    for every datasource in the file and is computed once per run.
+    
+    Returns:
+        Tuple of (datasource_type, connection_details)
+    """
+    connection_details: Dict[str, str] = {}
+    datasource_type = 'unknown'
+    
+    # Look for connection elements inside <datasource> elements
+    connections = (
+        conn
+        for datasource in find_elements(root, 'datasource')
+        for conn in datasource.findall('.//connection')
+    )
+    for conn in connections:
+        conn_class = conn.get('class', '').lower()
+        if 'bigquery' in conn_class:
+            datasource_type = 'bigquery'
+            connection_details['project'] = conn.get('project', '')
+            connection_details['dataset'] = conn.get('schema', '')
+        elif 'sql' in conn_class:
+            datasource_type = 'sql'
+            connection_details['server'] = conn.get('server', '')
+            connection_details['database'] = conn.get('dbname', '')
+        elif 'hyper' in conn_class:
+            datasource_type = 'hyper'
+            connection_details['dbname'] = conn.get('dbname', '')
+        break
+    
+    return datasource_type, connection_details
 
 
 def _extract_workbook_name(source_files: List[Dict[str, str]]) -> str:
@@ -76,15 +182,9 @@ async def parsing_agent(state: AssessmentState) -> AssessmentState:
     worksheets_index = discovered_components.get('worksheets', [])
     datasources_index = discovered_components.get('datasources', [])
     calculations_index = discovered_components.get('calculations', [])
-    filters_index = discovered_components.get('filters', [])
-    parameters_index = discovered_components.get('parameters', [])
     
-    # Create index maps for quick lookup
+    # Index worksheets by id for dependency resolution (the only lookup-by-id below)
     worksheets_map = {w.get('id'): w for w in worksheets_index if w.get('id')}
-    datasources_map = {ds.get('id'): ds for ds in datasources_index if ds.get('id')}
-    filters_map = {f.get('id'): f for f in filters_index if f.get('id')}
-    parameters_map = {p.get('id'): p for p in parameters_index if p.get('id')}
-    calculations_map = {c.get('id'): c for c in calculations_index if c.get('id')}
     
     # Parse dashboards
     parsed_dashboards: List[Dict[str, Any]] = []
@@ -92,27 +192,21 @@ async def parsing_agent(state: AssessmentState) -> AssessmentState:
         dashboard_id = dashboard_idx.get('id')
         dashboard_name = dashboard_idx.get('name', 'unnamed_dashboard')
         
-        logger.info(f"Processing dashboard: {dashboard_name} (id: {dashboard_id})")
+        logger.debug("Processing dashboard: %s (id: %s)", dashboard_name, dashboard_id)
         
         # Resolve dependencies
         worksheet_ids = dashboard_idx.get('worksheets', [])
         filter_ids = dashboard_idx.get('filters', [])
         parameter_ids = dashboard_idx.get('parameters', [])
         
-        # Get related datasources from worksheets
+        # Get related datasources from worksheets (calculations are not part of
+        # dashboard dependencies, so only datasources are resolved here)
         datasource_ids = set()
         for ws_id in worksheet_ids:
             ws = worksheets_map.get(ws_id)
             if ws:
                 datasource_ids.update(ws.get('datasources', []))
         
-        # Get related calculations from worksheets
-        calculation_ids = set()
-        for ws_id in worksheet_ids:
-            ws = worksheets_map.get(ws_id)
-            if ws:
-                calculation_ids.update(ws.get('calculations', []))
-        
         # Build features
         features = {
             'layout': 'multi_sheet' if len(worksheet_ids) > 1 else 'single_sheet',
@@ -151,7 +245,7 @@ async def parsing_agent(state: AssessmentState) -> AssessmentState:
         worksheet_id = worksheet_idx.get('id')
         worksheet_name = worksheet_idx.get('name', 'unnamed_worksheet')
         
-        logger.info(f"Processing worksheet: {worksheet_name} (id: {worksheet_id})")
+        logger.debug("Processing worksheet: %s (id: %s)", worksheet_name, worksheet_id)
         
         # Get dependencies
         datasource_ids = worksheet_idx.get('datasources', [])
@@ -185,46 +279,35 @@ async def parsing_agent(state: AssessmentState) -> AssessmentState:
             'dependencies': dependencies
         })
     
+    # Parse the datasources XML once - it feeds both connection details and formulas
+    datasources_file = elements_map.get('datasources')
+    datasources_root: Optional[ET.Element] = None
+    if (datasources_index or calculations_index) and datasources_file and os.path.exists(datasources_file):
+        try:
+            datasources_root = parse_xml_file(datasources_file)
+        except Exception as e:
+            logger.warning(f"Error parsing datasources XML {datasources_file}: {e}")
+    
     # Parse datasources
     parsed_datasources: List[Dict[str, Any]] = []
-    datasources_file = elements_map.get('datasources')
+    
+    # Try to read XML to extract type and connection details (same for every datasource)
+    shared_type = 'unknown'
+    shared_connection: Dict[str, str] = {}
+    if datasources_index and datasources_root is not None:
+        try:
+            shared_type, shared_connection = _extract_connection_details(datasources_root)
+        except Exception as e:
+            logger.warning(f"Error extracting datasource details from {datasources_file}: {e}")
     
     for datasource_idx in datasources_index:
         datasource_id = datasource_idx.get('id')
         datasource_name = datasource_idx.get('name', 'unnamed_datasource')
         
-        logger.info(f"Processing datasource: {datasource_name} (id: {datasource_id})")
-        
-        # Try to read XML to extract type and connection details
-        connection_details = {}
-        datasource_type = 'unknown'
+        logger.debug("Processing datasource: %s (id: %s)", datasource_name, datasource_id)
         
-        if datasources_file and os.path.exists(datasources_file):
-            try:
-                # Read datasource XML section
-                datasource_xml = read_xml_element(datasources_file, 'datasource')
-                if datasource_xml:
-                    # Try to extract type from XML (basic parsing)
-                    import xml.etree.ElementTree as ET
-                    root = ET.fromstring(f"<root>{datasource_xml}</root>")
-                    
-                    # Look for connection elements
-                    for conn in root.findall('.//connection'):
-                        conn_class = conn.get('class', '')
-                        if 'bigquery' in conn_class.lower():
-                            datasource_type = 'bigquery'
-                            connection_details['project'] = conn.get('project', '')
-                            connection_details['dataset'] = conn.get('schema', '')
-                        elif 'sql' in conn_class.lower():
-                            datasource_type = 'sql'
-                            connection_details['server'] = conn.get('server', '')
-                            connection_details['database'] = conn.get('dbname', '')
-                        elif 'hyper' in conn_class.lower():
-                            datasource_type = 'hyper'
-                            connection_details['dbname'] = conn.get('dbname', '')
-                        break
-            except Exception as e:
-                logger.warning(f"Error extracting datasource details for {datasource_name}: {e}")
+        connection_details = dict(shared_connection)
+        datasource_type = shared_type
         
         # Assess complexity (basic rule-based)
         complexity = 'low'
@@ -244,12 +327,13 @@ async def parsing_agent(state: AssessmentState) -> AssessmentState:
     
     # Parse calculations
     parsed_calculations: List[Dict[str, Any]] = []
+    formula_index: Optional[FormulaIndex] = None
     
     for calc_idx in calculations_index:
         calc_id = calc_idx.get('id')
         calc_name = calc_idx.get('name', 'unnamed_calculation')
         
-        logger.info(f"Processing calculation: {calc_name} (id: {calc_id})")
+        logger.debug("Processing calculation: %s (id: %s)", calc_name, calc_id)
         
         # Get datasource_id from relationships
         datasource_ids = calc_idx.get('related_datasources', [])
@@ -261,53 +345,20 @@ async def parsing_agent(state: AssessmentState) -> AssessmentState:
         # If no formula in index, extract from XML files
         if not formula:
             # Look for calculation in datasources XML (calculations are in <column> elements with <calculation> children)
-            datasources_file = elements_map.get('datasources')
-            if datasources_file and os.path.exists(datasources_file):
+            if datasources_root is not None:
                 try:
-                    import xml.etree.ElementTree as ET
-                    tree = ET.parse(datasources_file)
-                    root = tree.getroot()
+                    # Index calculated columns once instead of rescanning every column per calculation
+                    if formula_index is None:
+                        formula_index = _build_formula_index(datasources_root)
                     
-                    # Match by calculation ID (e.g., "[Calculation_14496010743898134]")
-                    # The ID from discovered_components should match the column name attribute
-                    for column in root.findall('.//column'):
-                        column_name = column.get('name', '')
-                        column_caption = column.get('caption', '')
-                        
-                        # Check if this column matches our calculation
-                        # Priority: 1) Match by ID (column name), 2) Match by name (column caption)
-                        matches = False
-                        if calc_id:
-                            # Remove brackets for comparison if needed
-                            calc_id_clean = calc_id.strip('[]')
-                            column_name_clean = column_name.strip('[]')
-                            if calc_id == column_name or calc_id_clean in column_name_clean or calc_id in column_name:
-                                matches = True
-                        
-                        if not matches and calc_name:
-                            # Match by caption (the display name)
-                            if calc_name == column_caption:
-                                matches = True
-                        
-                        if matches:
-                            # Find the calculation child element
-                            calc_elem = column.find('.//calculation')
-                            if calc_elem is not None:
-                                formula = calc_elem.get('formula', '')
-                                if formula:
-                                    logger.debug(f"Found formula for {calc_name} (id: {calc_id}): {formula[:100]}...")
-                                    break
+                    formula = _lookup_formula(formula_index, calc_id, calc_name)
+                    if formula:
+                        logger.debug("Found formula for %s (id: %s): %.100s...", calc_name, calc_id, formula)
                 except Exception as e:
                     logger.warning(f"Error extracting formula from datasources XML for {calc_name} (id: {calc_id}): {e}")
         
         # Assess complexity based on formula
-        complexity = 'low'
-        if formula:
-            formula_lower = formula.lower()
-            if any(keyword in formula_lower for keyword in ['window_', 'lod', 'table_calc', 'rank', 'running_', 'lookup']):
-                complexity = 'high'
-            elif any(keyword in formula_lower for keyword in ['if', 'case', 'sum', 'avg', 'count']):
-                complexity = 'medium'
+        complexity = _classify_formula_complexity(formula) if formula else 'low'
         
         parsed_calculations.append({
             'datasource_id': datasource_id,
@@ -323,26 +374,22 @@ async def parsing_agent(state: AssessmentState) -> AssessmentState:
         
         if parsed_dashboards:
             dashboards_file = os.path.join(output_dir, "parsed_dashboards.json")
-            with open(dashboards_file, 'w', encoding='utf-8') as f:
-                json.dump(parsed_dashboards, f, indent=2)
+            write_json_file(parsed_dashboards, dashboards_file)
             logger.info(f"Written {len(parsed_dashboards)} parsed dashboards to {dashboards_file}")
         
         if parsed_worksheets:
             worksheets_file = os.path.join(output_dir, "parsed_worksheets.json")
-            with open(worksheets_file, 'w', encoding='utf-8') as f:
-                json.dump(parsed_worksheets, f, indent=2)
+            write_json_file(parsed_worksheets, worksheets_file)
             logger.info(f"Written {len(parsed_worksheets)} parsed worksheets to {worksheets_file}")
         
         if parsed_datasources:
             datasources_file = os.path.join(output_dir, "parsed_datasources.json")
-            with open(datasources_file, 'w', encoding='utf-8') as f:
-                json.dump(parsed_datasources, f, indent=2)
+            write_json_file(parsed_datasources, datasources_file)
             logger.info(f"Written {len(parsed_datasources)} parsed datasources to {datasources_file}")
         
         if parsed_calculations:
             calculations_file = os.path.join(output_dir, "parsed_calculations.json")
-            with open(calculations_file, 'w', encoding='utf-8') as f:
-                json.dump(parsed_calculations, f, indent=2)
+            write_json_file(parsed_calculations, calculations_file)
             logger.info(f"Written {len(parsed_calculations)} parsed calculations to {calculations_file}")
     
     # Update state
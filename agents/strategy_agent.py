@@ -1,7 +1,6 @@
 """Strategy Agent - Step 4: Make recommendations."""
 from typing import Dict, Any, List
 from models.state import AssessmentState
-from services.llm_service import llm_service
 from services.bigquery_service import bigquery_service
 from dummy_data.sample_data import DUMMY_STRATEGY
 from utils.logger import logger
@@ -1,11 +1,11 @@
 """Visualization Agent - Step 3b: Analyze worksheets (visualizations)."""
 import os
-import json
 from typing import List, Dict, Any
 from datetime import datetime
 from models.state import AssessmentState
 from services.bigquery_service import bigquery_service
 from utils.logger import logger
+from utils.json_utils import write_json_file
 
 
 def _assess_complexity(features: Dict[str, Any], dependencies: Dict[str, Any]) -> str:
@@ -62,9 +62,10 @@ async def visualization_agent(state: AssessmentState) -> AssessmentState:
     parsed_worksheets = state.get('parsed_worksheets', [])
     if not parsed_worksheets:
         logger.warning("No parsed worksheets found, skipping worksheet analysis")
-        state['worksheet_analysis'] = []
-        state['status'] = 'analysis_complete'
-        return state
+        return {
+            'worksheet_analysis': [],
+            'visualization_analysis': []  # Backward compatibility
+        }
     
     job_id = state.get('job_id', 'unknown')
     created_at = datetime.utcnow().isoformat() + 'Z'
@@ -105,8 +106,7 @@ async def visualization_agent(state: AssessmentState) -> AssessmentState:
     if output_dir and analysis:
         os.makedirs(output_dir, exist_ok=True)
         output_file = os.path.join(output_dir, "worksheet_analysis.json")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(analysis, f, indent=2)
+        write_json_file(analysis, output_file)
         logger.info(f"Written {len(analysis)} worksheet analysis records to {output_file}")
     
     # Update state (only return fields we're modifying to avoid parallel update conflicts)
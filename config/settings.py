@@ -22,6 +22,11 @@ class Settings(BaseSettings):
         env="BIGQUERY_DATASET",
         description="BigQuery dataset name"
     )
+    bigquery_page_size: int = Field(
+        default=10000,
+        env="BIGQUERY_PAGE_SIZE",
+        description="Rows fetched per page when reading query results from BigQuery"
+    )
     gcs_bucket: Optional[str] = Field(
         default=None,
         env="GCS_BUCKET",
@@ -49,6 +54,21 @@ class Settings(BaseSettings):
         env="VERTEX_AI_LOCATION",
         description="Vertex AI location"
     )
+    llm_cache_enabled: bool = Field(
+        default=True,
+        env="LLM_CACHE_ENABLED",
+        description="Reuse validated Gemini responses for identical prompts"
+    )
+    llm_max_concurrent_requests: int = Field(
+        default=4,
+        env="LLM_MAX_CONCURRENT_REQUESTS",
+        description="Maximum number of Gemini requests in flight at once"
+    )
+    llm_cache_dir: Optional[str] = Field(
+        default=None,
+        env="LLM_CACHE_DIR",
+        description="Directory to persist cached Gemini responses across runs (memory only if unset)"
+    )
     
     # Application Configuration
     log_level: str = Field(
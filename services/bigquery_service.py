@@ -20,6 +20,7 @@ class BigQueryService:
         self.settings = get_settings()
         self.project_id = self.settings.gcp_project_id
         self.dataset = self.settings.bigquery_dataset
+        self._table_schemas: Optional[Dict[str, List[Any]]] = None
         
         if BIGQUERY_AVAILABLE and self.project_id:
             try:
@@ -37,45 +38,47 @@ class BigQueryService:
     
     def _get_table_schema(self, table_name: str) -> List[bigquery.SchemaField]:
         """Get BigQuery table schema for a given table."""
-        schemas = {
-            'dashboards': [
-                bigquery.SchemaField('workbook_name', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('name', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('id', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('features', 'JSON', mode='NULLABLE'),
-                bigquery.SchemaField('complexity', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('dependencies', 'JSON', mode='NULLABLE'),
-                bigquery.SchemaField('job_id', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('created_at', 'TIMESTAMP', mode='REQUIRED'),
-            ],
-            'worksheets': [
-                bigquery.SchemaField('name', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('id', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('features', 'JSON', mode='NULLABLE'),
-                bigquery.SchemaField('complexity', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('dependencies', 'JSON', mode='NULLABLE'),
-                bigquery.SchemaField('job_id', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('created_at', 'TIMESTAMP', mode='REQUIRED'),
-            ],
-            'datasources': [
-                bigquery.SchemaField('name', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('id', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('type', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('complexity', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('job_id', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('created_at', 'TIMESTAMP', mode='REQUIRED'),
-            ],
-            'calculation_fields': [
-                bigquery.SchemaField('datasource_id', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('field_name', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('formula', 'STRING', mode='NULLABLE'),
-                bigquery.SchemaField('complexity', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('job_id', 'STRING', mode='REQUIRED'),
-                bigquery.SchemaField('created_at', 'TIMESTAMP', mode='REQUIRED'),
-            ],
-        }
+        # Schemas are static - build the SchemaField objects once per service
+        if self._table_schemas is None:
+            self._table_schemas = {
+                'dashboards': [
+                    bigquery.SchemaField('workbook_name', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('name', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('id', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('features', 'JSON', mode='NULLABLE'),
+                    bigquery.SchemaField('complexity', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('dependencies', 'JSON', mode='NULLABLE'),
+                    bigquery.SchemaField('job_id', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('created_at', 'TIMESTAMP', mode='REQUIRED'),
+                ],
+                'worksheets': [
+                    bigquery.SchemaField('name', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('id', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('features', 'JSON', mode='NULLABLE'),
+                    bigquery.SchemaField('complexity', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('dependencies', 'JSON', mode='NULLABLE'),
+                    bigquery.SchemaField('job_id', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('created_at', 'TIMESTAMP', mode='REQUIRED'),
+                ],
+                'datasources': [
+                    bigquery.SchemaField('name', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('id', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('type', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('complexity', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('job_id', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('created_at', 'TIMESTAMP', mode='REQUIRED'),
+                ],
+                'calculation_fields': [
+                    bigquery.SchemaField('datasource_id', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('field_name', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('formula', 'STRING', mode='NULLABLE'),
+                    bigquery.SchemaField('complexity', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('job_id', 'STRING', mode='REQUIRED'),
+                    bigquery.SchemaField('created_at', 'TIMESTAMP', mode='REQUIRED'),
+                ],
+            }
         
-        return schemas.get(table_name, [])
+        return self._table_schemas.get(table_name, [])
     
     def _prepare_rows(self, table_name: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Prepare rows for BigQuery insertion - convert JSON fields to strings."""
@@ -153,7 +156,7 @@ class BigQueryService:
         
         # TEMPORARILY DISABLED - Just log instead of writing to BigQuery
         logger.info(f"[BIGQUERY DISABLED] Would insert {len(rows)} rows into {table_name}")
-        logger.debug(f"Sample row: {rows[0] if rows else 'N/A'}")
+        logger.debug("Sample row: %s", rows[0])
         return
         
         # Original BigQuery code (commented out for now)
@@ -218,7 +221,9 @@ class BigQueryService:
                 ]
             )
             
-            results = self.client.query(query, job_config=job_config)
+            query_job = self.client.query(query, job_config=job_config)
+            # Larger pages mean fewer getQueryResults round-trips on big tables
+            results = query_job.result(page_size=self.settings.bigquery_page_size)
             rows = [dict(row) for row in results]
             
             logger.info(f"Read {len(rows)} rows from {table_name} for job_id: {job_id}")
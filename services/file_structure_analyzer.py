@@ -1,6 +1,7 @@
 """File structure analyzers for different BI platforms."""
 import os
 import xml.etree.ElementTree as ET
+from collections import defaultdict
 from typing import Dict, Any, List
 from utils.logger import logger
 
@@ -50,32 +51,31 @@ class TableauStructureAnalyzer:
         
         # Use iterparse to extract structure (streaming - memory efficient)
         element_stack: List[str] = []
+        element_counts: Dict[str, int] = defaultdict(int)
+        # Parents per tag as insertion-ordered sets (dict keys) for O(1) membership
+        element_hierarchy: Dict[str, Dict[str, None]] = defaultdict(dict)
+        
+        root_elements = structure["root_elements"]
         
         try:
             for event, elem in ET.iterparse(file_path, events=('start', 'end')):
                 if event == 'start':
-                    element_stack.append(elem.tag)
-                    
                     # Track element types and counts
                     tag = elem.tag
-                    if tag not in structure["element_counts"]:
-                        structure["element_counts"][tag] = 0
-                        structure["element_hierarchy"][tag] = []
-                    
-                    structure["element_counts"][tag] += 1
+                    element_counts[tag] += 1
+                    parents = element_hierarchy[tag]
                     
-                    # Track hierarchy (parent-child relationships)
-                    if len(element_stack) > 1:
-                        parent = element_stack[-2] if len(element_stack) > 1 else None
-                        if parent and parent not in structure["element_hierarchy"][tag]:
-                            structure["element_hierarchy"][tag].append(parent)
+                    if element_stack:
+                        # Track hierarchy (parent-child relationships)
+                        parent = element_stack[-1]
+                        if parent:
+                            parents[parent] = None
+                    elif tag not in root_elements:
+                        # Track root elements
+                        root_elements.append(tag)
                     
-                    # Track root elements
-                    if len(element_stack) == 1:
-                        if tag not in structure["root_elements"]:
-                            structure["root_elements"].append(tag)
-                
-                if event == 'end':
+                    element_stack.append(tag)
+                else:
                     if element_stack:
                         element_stack.pop()
                     elem.clear()  # Free memory immediately
@@ -87,6 +87,9 @@ class TableauStructureAnalyzer:
             logger.error(f"Error parsing XML structure: {e}")
             # Return partial structure
         
+        structure["element_counts"] = dict(element_counts)
+        structure["element_hierarchy"] = {tag: list(parents) for tag, parents in element_hierarchy.items()}
+        
         # Estimate section sizes (approximate)
         structure["estimated_sections"] = self._estimate_section_sizes(
             file_path, 
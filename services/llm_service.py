@@ -1,11 +1,46 @@
 """LLM service for Gemini API calls via Vertex AI."""
 from typing import List, Dict, Any, Optional
+import asyncio
+import hashlib
+import io
 import json
 import os
+import tempfile
+from functools import lru_cache
 from utils.logger import logger
 from config.settings import get_settings
 import vertexai
-from vertexai.generative_models import GenerativeModel
+from vertexai.generative_models import GenerativeModel, GenerationConfig
+
+
+# All prompts in this service expect a JSON object back - constrain decoding to
+# JSON so the model cannot emit markdown fences or prose around the payload
+JSON_GENERATION_CONFIG = GenerationConfig(response_mime_type="application/json")
+
+
+# Output schema shared by the whole-file and strategy-based discovery prompts
+COMPONENT_CATALOG_SCHEMA_TEMPLATE = """Return a JSON object with this EXACT structure (no markdown, just JSON):
+{{
+    "dashboards": [
+        {{"id": "unique_id", "name": "dashboard_name", "platform": "{platform}"}}
+    ],
+    "metrics": [
+        {{"id": "unique_id", "name": "metric_name", "platform": "{platform}"}}
+    ],
+    "visualizations": [
+        {{"id": "unique_id", "name": "viz_name", "type": "chart_type", "platform": "{platform}"}}
+    ],
+    "datasources": [
+        {{"id": "unique_id", "name": "ds_name", "type": "connection_type", "platform": "{platform}"}}
+    ]
+}}
+"""
+
+
+@lru_cache(maxsize=16)
+def _component_catalog_schema(platform: str) -> str:
+    """Render the component catalog schema for a platform (rendered once per platform)."""
+    return COMPONENT_CATALOG_SCHEMA_TEMPLATE.format(platform=platform)
 
 
 class LLMService:
@@ -26,8 +61,120 @@ class LLMService:
             vertexai.init(location=self.location)
         
         self.model = GenerativeModel(self.model_name)
+        
+        # Validated responses keyed by sha256(model + prompt), see _generate()
+        self._response_cache: Dict[str, str] = {}
+        # Created lazily per event loop, see _get_request_semaphore()
+        self._request_semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
         logger.info(f"LLMService initialized with model: {self.model_name}")
     
+    def _cache_key(self, prompt: str) -> str:
+        """Build the response cache key for a prompt."""
+        return hashlib.sha256(f"{self.model_name}\n{prompt}".encode("utf-8")).hexdigest()
+    
+    async def _generate(self, prompt: str) -> str:
+        """
+        Call Gemini in JSON mode and return the response text without blocking
+        the event loop.
+        
+        Identical prompts (re-runs of the same workbook, repeated elements) are
+        served from an in-memory cache, backed by settings.llm_cache_dir when
+        configured, instead of calling the API again. Only responses stored via
+        _cache_response() after they parsed successfully are reused, and entries
+        that later fail to parse are dropped via _evict_cached_response(), so
+        malformed output is never replayed.
+        """
+        if not self.settings.llm_cache_enabled:
+            return await self._request_async(prompt)
+        
+        cache_key = self._cache_key(prompt)
+        cached = self._response_cache.get(cache_key)
+        if cached is None:
+            cached = self._read_cached_response(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached Gemini response ({len(cached):,} characters)")
+            return cached
+        
+        return await self._request_async(prompt)
+    
+    async def _request_async(self, prompt: str) -> str:
+        """Call Gemini in JSON mode, bounded by settings.llm_max_concurrent_requests."""
+        async with self._get_request_semaphore():
+            response = await self.model.generate_content_async(
+                prompt, generation_config=JSON_GENERATION_CONFIG
+            )
+        return response.text if response else ""
+    
+    def _get_request_semaphore(self) -> asyncio.Semaphore:
+        """Return the request semaphore, recreating it if the event loop changed."""
+        loop = asyncio.get_running_loop()
+        if self._request_semaphore is None or self._semaphore_loop is not loop:
+            self._request_semaphore = asyncio.Semaphore(self.settings.llm_max_concurrent_requests)
+            self._semaphore_loop = loop
+        return self._request_semaphore
+    
+    def _cache_response(self, prompt: str, result_text: str) -> None:
+        """Remember a response that parsed as valid JSON for the given prompt."""
+        if self.settings.llm_cache_enabled:
+            cache_key = self._cache_key(prompt)
+            if self._response_cache.get(cache_key) == result_text:
+                return  # Served from the cache - already stored
+            self._response_cache[cache_key] = result_text
+            self._write_cached_response(cache_key, result_text)
+    
+    def _evict_cached_response(self, prompt: str) -> None:
+        """Forget a cached response for the prompt that could not be used."""
+        if not self.settings.llm_cache_enabled:
+            return
+        cache_key = self._cache_key(prompt)
+        self._response_cache.pop(cache_key, None)
+        cache_file = self._cache_file(cache_key)
+        if cache_file and os.path.exists(cache_file):
+            try:
+                os.remove(cache_file)
+                logger.warning(f"Removed unusable LLM cache entry {cache_file}")
+            except OSError as e:
+                logger.warning(f"Could not remove LLM cache entry {cache_file}: {e}")
+    
+    def _cache_file(self, cache_key: str) -> Optional[str]:
+        """Path of the on-disk cache entry for a key, or None if disk caching is off."""
+        cache_dir = self.settings.llm_cache_dir
+        return os.path.join(cache_dir, f"{cache_key}.json") if cache_dir else None
+    
+    def _read_cached_response(self, cache_key: str) -> Optional[str]:
+        """Load a persisted response into the in-memory cache, if one exists."""
+        cache_file = self._cache_file(cache_key)
+        if not cache_file or not os.path.exists(cache_file):
+            return None
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = f.read()
+        except OSError as e:
+            logger.warning(f"Could not read LLM cache entry {cache_file}: {e}")
+            return None
+        self._response_cache[cache_key] = cached
+        return cached
+    
+    def _write_cached_response(self, cache_key: str, result_text: str) -> None:
+        """Persist a validated response so later runs can reuse it."""
+        cache_file = self._cache_file(cache_key)
+        if not cache_file:
+            return
+        tmp_file = None
+        try:
+            cache_dir = os.path.dirname(cache_file)
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial entry
+            fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(result_text)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning(f"Could not write LLM cache entry {cache_file}: {e}")
+            if tmp_file and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+    
     async def analyze_components(
         self, 
         file_content: str, 
@@ -55,19 +202,22 @@ class LLMService:
         
         # Call Gemini
         try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text
+            result_text = await self._generate(prompt)
             
             # Parse JSON from response
             # Gemini might wrap JSON in markdown code blocks
             result_text = self._extract_json(result_text)
             discovered_components = json.loads(result_text)
+            if not isinstance(discovered_components, dict):
+                raise ValueError(f"Expected a JSON object, got {type(discovered_components).__name__}")
+            self._cache_response(prompt, result_text)
             
             logger.info(f"Successfully discovered components from {file_path}")
             return discovered_components
             
         except Exception as e:
             logger.error(f"Error calling Gemini: {e}")
+            self._evict_cached_response(prompt)
             # Return empty structure on error
             return {
                 "dashboards": [],
@@ -102,22 +252,7 @@ class LLMService:
         """Build structured prompt for component discovery."""
         return f"""Analyze this {platform.upper()} metadata file and discover all components.
 
-Return a JSON object with this EXACT structure (no markdown, just JSON):
-{{
-    "dashboards": [
-        {{"id": "unique_id", "name": "dashboard_name", "platform": "{platform}"}}
-    ],
-    "metrics": [
-        {{"id": "unique_id", "name": "metric_name", "platform": "{platform}"}}
-    ],
-    "visualizations": [
-        {{"id": "unique_id", "name": "viz_name", "type": "chart_type", "platform": "{platform}"}}
-    ],
-    "datasources": [
-        {{"id": "unique_id", "name": "ds_name", "type": "connection_type", "platform": "{platform}"}}
-    ]
-}}
-
+{_component_catalog_schema(platform)}
 Important:
 - Extract ALL components you find
 - Use meaningful IDs (can be name-based or sequential)
@@ -132,7 +267,11 @@ File Content:
     def _extract_json(self, text: str) -> str:
         """Extract JSON from Gemini response (might be wrapped in markdown)."""
         text = text.strip()
-        
+
+        # Fast path: JSON-mode responses are already bare JSON
+        if text[:1] in ('{', '['):
+            return text
+
         # Remove markdown code blocks if present
         if text.startswith("```json"):
             text = text[7:]  # Remove ```json
@@ -175,21 +314,22 @@ File Content:
         
         try:
             logger.info("Calling Gemini API...")
-            response = self.model.generate_content(prompt)
+            result_text = await self._generate(prompt)
             
-            if not response or not response.text:
+            if not result_text:
                 logger.error("Gemini returned empty response")
                 raise ValueError("Empty response from Gemini")
             
-            result_text = response.text
             logger.info(f"Received response from Gemini: {len(result_text):,} characters")
-            logger.debug(f"Gemini response (first 500 chars): {result_text[:500]}")
+            logger.debug("Gemini response (first 500 chars): %.500s", result_text)
             
             # Extract JSON from response
             result_text = self._extract_json(result_text)
-            logger.debug(f"Extracted JSON (first 500 chars): {result_text[:500]}")
+            logger.debug("Extracted JSON (first 500 chars): %.500s", result_text)
             
             discovered_components = json.loads(result_text)
+            if not isinstance(discovered_components, dict):
+                raise ValueError(f"Expected a JSON object, got {type(discovered_components).__name__}")
             
             # Log what was discovered
             dashboards = discovered_components.get('dashboards', [])
@@ -212,20 +352,24 @@ File Content:
                 logger.warning("   3. Context window was exceeded (content truncated)")
                 logger.warning("   4. XML structure doesn't match expected format")
             
+            self._cache_response(prompt, result_text)
             return discovered_components
             
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON from Gemini response: {e}")
             logger.error(f"Response text (first 1000 chars): {result_text[:1000] if 'result_text' in locals() else 'N/A'}")
+            self._evict_cached_response(prompt)
             raise
         except Exception as e:
             error_type = type(e).__name__
             error_msg = str(e)
             logger.error(f"Error calling Gemini with strategy: {error_type}: {error_msg}")
             logger.error(f"Full error traceback:", exc_info=True)
+            self._evict_cached_response(prompt)
             
             # Check if it's a context window error
-            if 'token' in error_msg.lower() or 'context' in error_msg.lower() or 'limit' in error_msg.lower():
+            error_msg_lower = error_msg.lower()
+            if 'token' in error_msg_lower or 'context' in error_msg_lower or 'limit' in error_msg_lower:
                 logger.error("⚠️  CONTEXT WINDOW ERROR DETECTED - Strategy needs refinement!")
             
             # Re-raise instead of returning empty - let caller handle it
@@ -258,23 +402,32 @@ File Content:
         """
         logger.info(f"Extracting components from {element_name} element ({len(element_content):,} chars)")
         
+        # Nothing to discover - skip the Gemini round-trip entirely
+        if not element_content or not element_content.strip():
+            logger.warning(f"Element {element_name} is empty, skipping component extraction")
+            return {}
+        
         # Build generic discovery prompt
         prompt = self._build_element_extraction_prompt(element_name, element_content, platform)
         
         try:
             logger.info(f"Calling Gemini to extract components from {element_name}...")
-            response = self.model.generate_content(prompt)
+            result_text = await self._generate(prompt)
             
-            if not response or not response.text:
+            if not result_text:
                 logger.error(f"Gemini returned empty response for {element_name}")
+                self._evict_cached_response(prompt)
                 return {}
             
-            result_text = response.text
             logger.info(f"Received response from Gemini for {element_name}: {len(result_text):,} characters")
             
             # Extract JSON from response
             result_text = self._extract_json(result_text)
             components = json.loads(result_text)
+            if not isinstance(components, dict):
+                logger.error(f"Expected a JSON object for {element_name}, got {type(components).__name__}")
+                self._evict_cached_response(prompt)
+                return {}
             
             # Count extracted components
             total_components = sum(
@@ -283,14 +436,17 @@ File Content:
             )
             logger.info(f"Extracted {total_components} components from {element_name}")
             
+            self._cache_response(prompt, result_text)
             return components
             
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON from Gemini response for {element_name}: {e}")
             logger.error(f"Response text (first 1000 chars): {result_text[:1000] if 'result_text' in locals() else 'N/A'}")
+            self._evict_cached_response(prompt)
             return {}  # Return empty dict on error, don't fail entire process
         except Exception as e:
             logger.error(f"Error extracting components from {element_name}: {e}", exc_info=True)
+            self._evict_cached_response(prompt)
             return {}  # Return empty dict on error, don't fail entire process
     
     def _build_element_extraction_prompt(
@@ -377,7 +533,7 @@ Only include component types that actually exist in this element. Omit empty arr
         """
         Extract component catalog by processing each element separately.
         
-        This method processes each element file sequentially with individual LLM calls,
+        This method processes the element files concurrently with individual LLM calls,
         then merges all results into a single component catalog.
         
         Args:
@@ -408,25 +564,27 @@ Only include component types that actually exist in this element. Omit empty arr
             "calculations": []
         }
         
-        # Process each element sequentially
-        for element_name, element_content in element_contents.items():
-            logger.info(f"Processing element: {element_name}")
-            
-            try:
-                result = await self.extract_components_from_element(
-                    element_name, element_content, platform
-                )
-                
-                # Merge results into catalog
-                for component_type in merged_catalog.keys():
-                    if component_type in result and isinstance(result[component_type], list):
-                        merged_catalog[component_type].extend(result[component_type])
-                        logger.info(f"  Added {len(result[component_type])} {component_type} from {element_name}")
-                
-            except Exception as e:
-                logger.error(f"Error processing element {element_name}: {e}", exc_info=True)
+        # Process all elements concurrently - each element is an independent Gemini call
+        element_names = list(element_contents.keys())
+        results = await asyncio.gather(
+            *(
+                self.extract_components_from_element(element_name, element_contents[element_name], platform)
+                for element_name in element_names
+            ),
+            return_exceptions=True
+        )
+        
+        # Merge results into catalog in element order
+        for element_name, result in zip(element_names, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error processing element {element_name}: {result}", exc_info=result)
                 # Continue with other elements even if one fails
                 continue
+            
+            for component_type in merged_catalog.keys():
+                if component_type in result and isinstance(result[component_type], list):
+                    merged_catalog[component_type].extend(result[component_type])
+                    logger.info(f"  Added {len(result[component_type])} {component_type} from {element_name}")
         
         # Log summary
         dashboards = merged_catalog.get('dashboards', [])
@@ -478,7 +636,7 @@ Only include component types that actually exist in this element. Omit empty arr
             
             # Read each target element
             for element_name in target_elements:
-                logger.debug(f"  Reading element: {element_name}")
+                logger.debug("  Reading element: %s", element_name)
                 element_content = read_xml_element(file_path, element_name)
                 
                 if element_content:
@@ -498,7 +656,7 @@ Only include component types that actually exist in this element. Omit empty arr
                 context_chunk = chunks.get(context_chunk_id)
                 if context_chunk:
                     for context_element in context_chunk.get('target_elements', []):
-                        logger.debug(f"  Reading context element: {context_element}")
+                        logger.debug("  Reading context element: %s", context_element)
                         context_content = read_xml_element(file_path, context_element)
                         if context_content:
                             context_size = len(context_content)
@@ -529,32 +687,35 @@ Only include component types that actually exist in this element. Omit empty arr
         total_size = sum(chunk_sizes.values())
         logger.info(f"Total chunk content size: {total_size:,} bytes ({total_size/1024/1024:.2f} MB)")
         
-        # Build prompt with all chunk contents
-        chunks_info = []
+        # Build prompt with all chunk contents - write sections into a single
+        # buffer so multi-MB chunk XML is copied once instead of per f-string/join
+        buffer = io.StringIO()
+        buffer.write(f"""You are analyzing a {platform.upper()} metadata file to discover all components.
+
+You have a file splitting strategy that breaks the file into manageable chunks. The chunks have already been extracted for you.
+
+File: {file_path}
+Strategy Method: {strategy.get('split_method', 'element_based')}
+Processing Order: {processing_order}
+
+Chunks with XML Content:
+""")
         for chunk_id in processing_order:
             chunk = chunks.get(chunk_id)
             if not chunk:
                 continue
-            chunks_info.append(f"""
+            buffer.write(f"""
 === Chunk: {chunk_id} ===
 Target Elements: {chunk.get('target_elements', [])}
 Priority: {chunk.get('priority', 'medium')}
 Context Needed: {chunk.get('context_needed', [])}
 
 XML Content:
-{chunk_contents.get(chunk_id, '<!-- No content found -->')}
 """)
+            buffer.write(chunk_contents.get(chunk_id, '<!-- No content found -->'))
+            buffer.write("\n")
         
-        prompt = f"""You are analyzing a {platform.upper()} metadata file to discover all components.
-
-You have a file splitting strategy that breaks the file into manageable chunks. The chunks have already been extracted for you.
-
-File: {file_path}
-Strategy Method: {strategy.get('split_method', 'element_based')}
-Processing Order: {processing_order}
-
-Chunks with XML Content:
-{''.join(chunks_info)}
+        buffer.write(f"""
 
 Instructions:
 1. Analyze each chunk's XML content to discover components
@@ -570,24 +731,10 @@ Important:
 - For datasources, identify connection type (sql_server, postgresql, excel, etc.)
 - Maintain relationships (e.g., which worksheets use which datasources)
 
-Return a JSON object with this EXACT structure (no markdown, just JSON):
-{{
-    "dashboards": [
-        {{"id": "unique_id", "name": "dashboard_name", "platform": "{platform}"}}
-    ],
-    "metrics": [
-        {{"id": "unique_id", "name": "metric_name", "platform": "{platform}"}}
-    ],
-    "visualizations": [
-        {{"id": "unique_id", "name": "viz_name", "type": "chart_type", "platform": "{platform}"}}
-    ],
-    "datasources": [
-        {{"id": "unique_id", "name": "ds_name", "type": "connection_type", "platform": "{platform}"}}
-    ]
-}}
-
+{_component_catalog_schema(platform)}
 Analyze all chunks and return the complete combined result.
-"""
+""")
+        prompt = buffer.getvalue()
         
         prompt_size = len(prompt)
         logger.info(f"Built prompt: {prompt_size:,} characters ({prompt_size/1024/1024:.2f} MB)")
@@ -619,18 +766,21 @@ Analyze all chunks and return the complete combined result.
         prompt = self._build_strategy_prompt(structure_info, platform)
         
         try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text
+            result_text = await self._generate(prompt)
             
             # Extract JSON from response
             result_text = self._extract_json(result_text)
             strategy = json.loads(result_text)
+            if not isinstance(strategy, dict):
+                raise ValueError(f"Expected a JSON object, got {type(strategy).__name__}")
+            self._cache_response(prompt, result_text)
             
             logger.info(f"Successfully created splitting strategy")
             return strategy
             
         except Exception as e:
             logger.error(f"Error creating strategy: {e}")
+            self._evict_cached_response(prompt)
             # Return default strategy
             return self._create_default_strategy(structure_info)
     
@@ -756,19 +906,22 @@ Return ONLY valid JSON, no markdown formatting.
         )
         
         try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text
+            result_text = await self._generate(prompt)
             
             # Extract JSON from response
             result_text = self._extract_json(result_text)
             strategy = json.loads(result_text)
+            if not isinstance(strategy, dict):
+                raise ValueError(f"Expected a JSON object, got {type(strategy).__name__}")
             
             logger.info(f"Successfully refined splitting strategy")
             logger.info(f"Refined strategy has {len(strategy.get('chunks', []))} chunks")
+            self._cache_response(prompt, result_text)
             return strategy
             
         except Exception as e:
             logger.error(f"Error refining strategy: {e}")
+            self._evict_cached_response(prompt)
             # Return more granular default strategy
             return self._create_refined_default_strategy(structure_info, refinement_feedback)
     
@@ -782,13 +935,14 @@ Return ONLY valid JSON, no markdown formatting.
         """Build prompt for strategy refinement."""
         file_size_mb = structure_info['file_size_bytes'] / 1024 / 1024
         
+        # Compact JSON: indentation only adds whitespace tokens to the prompt
         return f"""The previous splitting strategy failed. You need to create a MORE GRANULAR strategy.
 
 Previous Strategy Failure:
-{json.dumps(refinement_feedback, indent=2)}
+{json.dumps(refinement_feedback, separators=(',', ':'))}
 
 Previous Strategy (that failed):
-{json.dumps(previous_strategy, indent=2)}
+{json.dumps(previous_strategy, separators=(',', ':'))}
 
 File Information:
 - Size: {structure_info['file_size_bytes']:,} bytes ({file_size_mb:.2f} MB)
@@ -797,8 +951,8 @@ File Information:
 
 File Structure:
 - Root elements: {structure_info['root_elements']}
-- Element counts: {json.dumps(structure_info['element_counts'], indent=2)}
-- Element hierarchy: {json.dumps(structure_info['element_hierarchy'], indent=2)}
+- Element counts: {json.dumps(structure_info['element_counts'], separators=(',', ':'))}
+- Element hierarchy: {json.dumps(structure_info['element_hierarchy'], separators=(',', ':'))}
 
 CRITICAL: Use EXACT element names from element_counts above. Do NOT assume element names like 'worksheets' - check what actually exists in the file.
 
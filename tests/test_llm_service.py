@@ -0,0 +1,126 @@
+"""Unit tests for the LLM service response cache."""
+import pytest
+from services import llm_service as llm_service_module
+from services.llm_service import LLMService
+
+
+class FakeResponse:
+    """Minimal stand-in for a Gemini response."""
+    
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Stubbed Gemini model returning a fixed response and counting calls."""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.calls = 0
+    
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        return FakeResponse(self.text)
+
+
+@pytest.fixture
+def llm_service(monkeypatch, tmp_path) -> LLMService:
+    """Create an LLMService with Vertex AI stubbed out and caching enabled."""
+    monkeypatch.setattr(llm_service_module.vertexai, "init", lambda **kwargs: None)
+    monkeypatch.setattr(llm_service_module, "GenerativeModel", lambda name: FakeModel("{}"))
+    service = LLMService()
+    monkeypatch.setattr(service.settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(service.settings, "llm_cache_dir", str(tmp_path / "llm_cache"))
+    return service
+
+
+@pytest.mark.asyncio
+async def test_extract_components_cache_miss_then_hit(llm_service: LLMService):
+    """Test that a valid response is cached and reused for the same prompt."""
+    llm_service.model = FakeModel('```json\n{"worksheets": [{"id": "ws1", "name": "Sales"}]}\n```')
+    
+    first = await llm_service.extract_components_from_element("worksheets", "<worksheets/>", "tableau")
+    second = await llm_service.extract_components_from_element("worksheets", "<worksheets/>", "tableau")
+    
+    assert first == {"worksheets": [{"id": "ws1", "name": "Sales"}]}
+    assert second == first
+    assert llm_service.model.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_extract_components_cache_survives_new_service(llm_service: LLMService):
+    """Test that the on-disk cache is reused by a fresh service instance."""
+    llm_service.model = FakeModel('{"dashboards": [{"id": "db1", "name": "Overview"}]}')
+    await llm_service.extract_components_from_element("dashboards", "<dashboards/>", "tableau")
+    
+    fresh_service = LLMService()
+    fresh_service.model = FakeModel("{}")
+    result = await fresh_service.extract_components_from_element("dashboards", "<dashboards/>", "tableau")
+    
+    assert result == {"dashboards": [{"id": "db1", "name": "Overview"}]}
+    assert fresh_service.model.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_extract_components_bad_response_not_cached(llm_service: LLMService):
+    """Test that a response with the wrong shape is not cached."""
+    llm_service.model = FakeModel('[{"id": "ws1"}]')
+    
+    first = await llm_service.extract_components_from_element("worksheets", "<worksheets/>", "tableau")
+    second = await llm_service.extract_components_from_element("worksheets", "<worksheets/>", "tableau")
+    
+    assert first == {}
+    assert second == {}
+    assert llm_service.model.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_create_strategy_bad_response_not_cached(llm_service: LLMService):
+    """Test that a non-object strategy falls back to the default and is not cached."""
+    llm_service.model = FakeModel('"not a strategy"')
+    structure_info = {
+        "file_size_bytes": 1000,
+        "file_type": "xml",
+        "platform": "tableau",
+        "root_elements": ["datasources", "worksheets"],
+        "element_counts": {"datasources": 1, "worksheets": 1},
+        "element_hierarchy": {"workbook": ["datasources", "worksheets"]},
+        "estimated_sections": 2,
+        "sample_content": "<workbook/>",
+    }
+    
+    first = await llm_service.create_file_splitting_strategy(structure_info, "tableau", "test.twb")
+    await llm_service.create_file_splitting_strategy(structure_info, "tableau", "test.twb")
+    
+    assert first["split_method"] == "element_based"
+    assert len(first["chunks"]) == 2
+    assert llm_service.model.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_extract_components_corrupt_cache_entry_evicted(llm_service: LLMService):
+    """Test that a cached entry that no longer parses is dropped and refetched."""
+    prompt = llm_service._build_element_extraction_prompt("worksheets", "<worksheets/>", "tableau")
+    llm_service._write_cached_response(llm_service._cache_key(prompt), '{"worksheets": [')
+    llm_service.model = FakeModel('{"worksheets": [{"id": "ws1", "name": "Sales"}]}')
+    
+    first = await llm_service.extract_components_from_element("worksheets", "<worksheets/>", "tableau")
+    second = await llm_service.extract_components_from_element("worksheets", "<worksheets/>", "tableau")
+    
+    assert first == {}
+    assert second == {"worksheets": [{"id": "ws1", "name": "Sales"}]}
+    assert llm_service.model.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_extract_components_cache_hit_not_rewritten(llm_service: LLMService, monkeypatch):
+    """Test that a response served from the cache is not written back to disk."""
+    llm_service.model = FakeModel('{"worksheets": [{"id": "ws1", "name": "Sales"}]}')
+    await llm_service.extract_components_from_element("worksheets", "<worksheets/>", "tableau")
+    
+    writes = []
+    monkeypatch.setattr(llm_service, "_write_cached_response", lambda *args: writes.append(args))
+    await llm_service.extract_components_from_element("worksheets", "<worksheets/>", "tableau")
+    
+    assert writes == []
+    assert llm_service.model.calls == 1
@@ -0,0 +1,79 @@
+"""Unit tests for parsing agent helpers."""
+import xml.etree.ElementTree as ET
+import pytest
+from agents.parsing_agent import FormulaIndex, _build_formula_index, _lookup_formula
+
+
+DATASOURCES_XML = """
+<datasources>
+    <datasource name="sales">
+        <column name="[Calculation_12]" caption="Margin">
+            <calculation class="tableau" formula="SUM([Profit]) / SUM([Sales])" />
+        </column>
+        <column name="[Calculation_1]" caption="Profit Ratio">
+            <calculation class="tableau" formula="SUM([Profit])" />
+        </column>
+        <column name="Region Group" caption="Region Bucket">
+            <calculation class="tableau" formula="IF [Region] = 'West' THEN 'W' END" />
+        </column>
+        <column name="[Sales]" caption="Sales" />
+        <column name="[Empty]" caption="Empty">
+            <calculation class="tableau" formula="" />
+        </column>
+        <column name="[Calculation_300_Sales]" caption="Running Sales">
+            <calculation class="tableau" formula="RUNNING_SUM(SUM([Sales]))" />
+        </column>
+    </datasource>
+</datasources>
+"""
+
+
+@pytest.fixture
+def formula_index() -> FormulaIndex:
+    """Build a formula index from a small datasources element."""
+    return _build_formula_index(ET.fromstring(DATASOURCES_XML))
+
+
+def test_build_formula_index(formula_index: FormulaIndex):
+    """Test that only columns with a non-empty formula are indexed, in document order."""
+    by_name, by_caption, entries = formula_index
+    
+    assert by_name["[Calculation_1]"] == "SUM([Profit])"
+    assert by_caption["Margin"] == "SUM([Profit]) / SUM([Sales])"
+    assert "[Sales]" not in by_name
+    assert "[Empty]" not in by_name
+    assert [name for name, _ in entries] == [
+        "[Calculation_12]",
+        "[Calculation_1]",
+        "Region Group",
+        "[Calculation_300_Sales]",
+    ]
+
+
+def test_lookup_formula_exact_id(formula_index: FormulaIndex):
+    """Test lookup by the exact column name."""
+    assert _lookup_formula(formula_index, "[Calculation_1]", None) == "SUM([Profit])"
+    assert _lookup_formula(formula_index, "Region Group", None) == "IF [Region] = 'West' THEN 'W' END"
+
+
+def test_lookup_formula_bracketed_id(formula_index: FormulaIndex):
+    """Test that an unbracketed ID matches its bracketed column, not a longer partial match."""
+    assert _lookup_formula(formula_index, "Calculation_1", None) == "SUM([Profit])"
+    assert _lookup_formula(formula_index, "Calculation_12", None) == "SUM([Profit]) / SUM([Sales])"
+
+
+def test_lookup_formula_caption(formula_index: FormulaIndex):
+    """Test lookup by caption when the ID does not match exactly."""
+    assert _lookup_formula(formula_index, None, "Region Bucket") == "IF [Region] = 'West' THEN 'W' END"
+    assert _lookup_formula(formula_index, "unknown_id", "Margin") == "SUM([Profit]) / SUM([Sales])"
+
+
+def test_lookup_formula_partial_id(formula_index: FormulaIndex):
+    """Test the partial ID match used as a last resort."""
+    assert _lookup_formula(formula_index, "Calculation_300", None) == "RUNNING_SUM(SUM([Sales]))"
+
+
+def test_lookup_formula_not_found(formula_index: FormulaIndex):
+    """Test that unknown calculations resolve to an empty formula."""
+    assert _lookup_formula(formula_index, "Calculation_999", "Unknown") == ""
+    assert _lookup_formula(formula_index, None, None) == ""
@@ -0,0 +1,32 @@
+"""JSON utilities for writing agent outputs."""
+import json
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def write_json_file(data: Any, file_path: str) -> None:
+    """
+    Write data to a file as indented (2 spaces) UTF-8 JSON.
+    
+    Uses orjson when it is installed (several times faster on large outputs),
+    falling back to the standard library encoder otherwise. Both backends
+    write non-ASCII characters as UTF-8 rather than \\u escapes, so the
+    output is the same either way.
+    
+    Args:
+        data: JSON-serializable data
+        file_path: Path of the output file
+    """
+    if ORJSON_AVAILABLE:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    
+    with open(file_path, 'wb') as f:
+        f.write(payload)
+
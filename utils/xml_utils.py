@@ -1,33 +1,89 @@
 """XML utility functions - simple tools for agents."""
 import xml.etree.ElementTree as ET
-from typing import List
+from typing import Dict, List
 from utils.logger import logger
 
 
-def get_first_level_elements(file_path: str) -> List[str]:
+def parse_xml_file(file_path: str) -> ET.Element:
     """
-    Get direct children of root XML element.
+    Parse an XML file and return its root element.
+    
+    Callers that need several pieces of the same file should parse it once
+    and pass the root around (see find_elements()) rather than re-reading it.
     
     Args:
         file_path: Path to the XML file
         
     Returns:
-        List of element names (e.g., ['datasources', 'worksheets', 'dashboards'])
+        Root element of the parsed document
+    """
+    return ET.parse(file_path).getroot()
+
+
+def find_elements(root: ET.Element, element_name: str) -> List[ET.Element]:
+    """
+    Find all instances of an element in a parsed document.
+    
+    Direct children of the root are preferred (first-level elements); otherwise
+    all descendants are searched, ignoring namespaces as a last resort.
+    
+    Args:
+        root: Root element of the parsed document
+        element_name: Name of the XML element to find (e.g., "datasource")
+        
+    Returns:
+        Matching elements in document order (empty list if not found)
+    """
+    # First, try to find as direct child of root (for first-level elements)
+    elements = []
+    for child in root:
+        tag_name = child.tag.split('}')[-1] if '}' in child.tag else child.tag
+        if tag_name == element_name:
+            elements.append(child)
+    
+    # If not found as direct child, search all descendants
+    if not elements:
+        elements = root.findall(f'.//{element_name}')
+    
+    # If still not found, try with namespace handling (search all)
+    if not elements:
+        elements = [
+            e for e in root.iter()
+            if e.tag.split('}')[-1] == element_name  # Get local name after namespace
+        ]
+    
+    return elements
+
+
+def read_first_level_elements(file_path: str) -> Dict[str, str]:
+    """
+    Read every first-level element of an XML file in a single pass.
+    
+    The root's children are walked once and grouped by tag, instead of calling
+    read_xml_element() once per element name.
+    
+    Args:
+        file_path: Path to the XML file
+        
+    Returns:
+        Dict mapping element name -> concatenated XML of all its instances,
+        in document order of first appearance (empty dict on error)
     """
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        first_level = []
+        root = parse_xml_file(file_path)
+        grouped: Dict[str, List[ET.Element]] = {}
         for child in root:
-            # Handle namespaces - get local name after namespace
             tag_name = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-            if tag_name not in first_level:
-                first_level.append(tag_name)
-        logger.info(f"Found {len(first_level)} first-level elements: {first_level}")
-        return first_level
+            grouped.setdefault(tag_name, []).append(child)
+        
+        logger.info(f"Found {len(grouped)} first-level elements: {list(grouped)}")
+        return {
+            tag_name: '\n'.join(ET.tostring(e, encoding='unicode') for e in elements)
+            for tag_name, elements in grouped.items()
+        }
     except Exception as e:
-        logger.error(f"Error getting first-level elements: {e}")
-        return []
+        logger.error(f"Error reading first-level elements from {file_path}: {e}")
+        return {}
 
 
 def read_xml_element(file_path: str, element_name: str) -> str:
@@ -47,26 +103,8 @@ def read_xml_element(file_path: str, element_name: str) -> str:
         XML string containing all instances of the element, or empty string if not found
     """
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        
-        # First, try to find as direct child of root (for first-level elements)
-        elements = []
-        for child in root:
-            tag_name = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-            if tag_name == element_name:
-                elements.append(child)
-        
-        # If not found as direct child, search all descendants
-        if not elements:
-            elements = root.findall(f'.//{element_name}')
-        
-        # If still not found, try with namespace handling (search all)
-        if not elements:
-            elements = [
-                e for e in root.iter()
-                if e.tag.split('}')[-1] == element_name  # Get local name after namespace
-            ]
+        root = parse_xml_file(file_path)
+        elements = find_elements(root, element_name)
         
         if not elements:
             logger.warning(f"No elements found for '{element_name}' in {file_path}")